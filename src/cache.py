@@ -0,0 +1,299 @@
+"""Local memory-mapped cache for small warehouse relations (dimensions, KPIs)."""
+from __future__ import annotations
+
+from collections import OrderedDict
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+import datetime
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from .config import CACHE_DIR
+from .db import EngineFactory
+
+logger = logging.getLogger(__name__)
+
+CACHED_RELATIONS = ("dim_restaurant", "dim_courier", "dim_customer", "kpi_delivery_overview")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 32
+
+_META_FILE = "meta.json"
+
+# Every table and view the relation reads from, following view rewrite rules recursively.
+POSTGRES_DEPENDENCIES_SQL = """
+WITH RECURSIVE deps(oid) AS (
+  SELECT to_regclass(:relation)::oid
+  UNION
+  SELECT d.refobjid
+  FROM deps
+  JOIN pg_rewrite r ON r.ev_class = deps.oid
+  JOIN pg_depend d
+    ON d.classid = 'pg_rewrite'::regclass
+   AND d.objid = r.oid
+   AND d.refclassid = 'pg_class'::regclass
+   AND d.refobjid <> deps.oid
+)
+SELECT
+  c.oid,
+  quote_ident(n.nspname) || '.' || quote_ident(c.relname) AS qualified_name,
+  c.relkind,
+  CASE WHEN c.relkind IN ('v', 'm') THEN md5(pg_get_viewdef(c.oid)) END AS definition
+FROM deps
+JOIN pg_class c ON c.oid = deps.oid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+ORDER BY c.oid
+"""
+
+
+class _Uncacheable(Exception):
+    """Raised when a column cannot be stored and restored exactly."""
+
+
+class RelationCache:
+    """Snapshot relations into per-column ``.npy`` files and read them back memory-mapped.
+
+    Entries are keyed by relation name and a content version of what the relation
+    reads. On PostgreSQL the version covers every table and view the relation
+    depends on: view definitions (``md5(pg_get_viewdef)``), table oids (``to_sql``
+    replaces tables) and each table's row count and newest ``xmin``. On SQLite the
+    version is the schema version plus the database file stamp, so any write to the
+    database file (including ``dq_failures__*`` tables) invalidates every entry.
+    In-memory SQLite databases have no stable version and always bypass the cache,
+    as do relations with a column that cannot be round-tripped exactly.
+    """
+
+    def __init__(
+        self,
+        factory: EngineFactory,
+        cache_dir: Path | None = None,
+        relations: Iterable[str] = CACHED_RELATIONS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self._factory = factory
+        self._cache_dir = cache_dir or CACHE_DIR
+        self.relations = tuple(relations)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._opened: "OrderedDict[Tuple[str, str], pd.DataFrame]" = OrderedDict()
+        self._uncacheable: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, relation: str) -> bool:
+        return relation in self.relations
+
+    def version(self, relation: str) -> str | None:
+        """Return the content version of ``relation``, or ``None`` if uncacheable."""
+
+        if self._factory.dialect == "sqlite":
+            database = self._factory.get_engine().url.database
+            if not database or database == ":memory:":
+                return None
+            with self._factory.connect() as conn:
+                schema_version = conn.execute(text("PRAGMA schema_version")).scalar_one()
+            stat = os.stat(database)
+            raw = f"{schema_version}:{stat.st_mtime_ns}:{stat.st_size}"
+            return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+        with self._factory.connect() as conn:
+            deps = conn.execute(text(POSTGRES_DEPENDENCIES_SQL), {"relation": relation}).all()
+            tables = [(oid, name) for oid, name, kind, _ in deps if kind in ("r", "m", "p")]
+            contents: Dict[int, str] = {}
+            if tables:
+                # max(xmin) moves on every insert/update; count(*) catches deletes.
+                stats_sql = " UNION ALL ".join(
+                    f"SELECT {oid}::oid, count(*)::text || ':' || COALESCE(max(xmin::text::bigint), 0)::text"
+                    f" FROM {name}"
+                    for oid, name in tables
+                )
+                contents = dict(conn.execute(text(stats_sql)).all())
+        raw = ",".join(
+            f"{oid}:{kind}:{definition or ''}:{contents.get(oid, '')}" for oid, _, kind, definition in deps
+        )
+        return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, relation: str, version: str) -> Path:
+        return self._cache_dir / f"{relation}-{version[:16]}"
+
+    def read_frame(self, relation: str) -> pd.DataFrame:
+        """Return ``relation`` as it would come from ``pd.read_sql``, but from the cache.
+
+        Numeric, boolean and naive datetime columns are read-only memory maps (no
+        copy); without pandas copy-on-write, writing into them raises ``ValueError``.
+        Other columns are rebuilt with their original dtype and values.
+        """
+
+        version = self.version(relation)
+        if version is None or self._uncacheable.get(relation) == version:
+            return self._query(relation)
+
+        key = (relation, version)
+        entry = self._entry_dir(relation, version)
+        meta_path = entry / _META_FILE
+        try:
+            # Every hit refreshes the on-disk recency that _evict orders by.
+            os.utime(meta_path)
+        except FileNotFoundError:
+            self._opened.pop(key, None)
+            self.misses += 1
+            df = self._query(relation)
+            try:
+                self._store(entry, relation, version, df)
+            except _Uncacheable as exc:
+                logger.debug("Not caching %s: %s", relation, exc)
+                self._uncacheable[relation] = version
+                return df
+        else:
+            self.hits += 1
+            if key in self._opened:
+                self._opened.move_to_end(key)
+                return self._opened[key].copy(deep=False)
+
+        frame = _load_entry(entry)
+        self._opened[key] = frame
+        while len(self._opened) > self.max_entries:
+            self._opened.popitem(last=False)
+        return frame.copy(deep=False)
+
+    def invalidate(self, relation: str | None = None) -> None:
+        """Drop cached entries for one relation, or the whole cache."""
+
+        for key in list(self._opened):
+            if relation is None or key[0] == relation:
+                del self._opened[key]
+        for entry, meta in _list_entries(self._cache_dir):
+            if relation is None or meta["relation"] == relation:
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def _query(self, relation: str) -> pd.DataFrame:
+        return pd.read_sql(text(f"SELECT * FROM {relation}"), self._factory.get_engine())
+
+    def _store(self, entry: Path, relation: str, version: str, df: pd.DataFrame) -> None:
+        encoded = [_encode_column(df[name]) for name in df.columns]
+
+        # Older versions of the same relation can never be read again.
+        for stale, meta in _list_entries(self._cache_dir):
+            if meta["relation"] == relation and meta["version"] != version:
+                shutil.rmtree(stale, ignore_errors=True)
+
+        staging = entry.with_name(entry.name + ".tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        columns: List[dict] = []
+        for index, (name, (values, mask, column_meta)) in enumerate(zip(df.columns, encoded)):
+            np.save(staging / f"{index}.npy", values, allow_pickle=False)
+            if mask is not None:
+                np.save(staging / f"{index}.mask.npy", mask, allow_pickle=False)
+            columns.append({"name": str(name), "mask": mask is not None, **column_meta})
+        meta = {"relation": relation, "version": version, "columns": columns, "rows": len(df)}
+        (staging / _META_FILE).write_text(json.dumps(meta), encoding="utf-8")
+        shutil.rmtree(entry, ignore_errors=True)
+        staging.rename(entry)
+        logger.debug("Cached %s (%s rows) in %s", relation, len(df), entry)
+        self._evict(keep=entry)
+
+    def _evict(self, keep: Path) -> None:
+        """Remove least recently read entries until the size and count limits hold."""
+
+        entries = sorted(
+            _list_entries(self._cache_dir), key=lambda item: (item[0] / _META_FILE).stat().st_mtime_ns
+        )
+        sizes = {entry: sum(f.stat().st_size for f in entry.iterdir()) for entry, _ in entries}
+        total = sum(sizes.values())
+        count = len(entries)
+        for entry, meta in entries:
+            if total <= self.max_bytes and count <= self.max_entries:
+                break
+            if entry == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            self._opened.pop((meta["relation"], meta["version"]), None)
+            total -= sizes[entry]
+            count -= 1
+
+
+def _list_entries(cache_dir: Path) -> List[Tuple[Path, dict]]:
+    if not cache_dir.exists():
+        return []
+    entries: List[Tuple[Path, dict]] = []
+    for meta_path in cache_dir.glob(f"*/{_META_FILE}"):
+        if meta_path.parent.name.endswith(".tmp"):
+            continue
+        entries.append((meta_path.parent, json.loads(meta_path.read_text(encoding="utf-8"))))
+    return entries
+
+
+# Object values that can be written as text and parsed back to an equal value.
+_TEXT_CODECS = {
+    str: ("str", str),
+    Decimal: ("decimal", Decimal),
+    datetime.date: ("date", datetime.date.fromisoformat),
+}
+_TEXT_DECODERS = {kind: decode for kind, decode in _TEXT_CODECS.values()}
+
+
+def _encode_column(series: pd.Series) -> Tuple[np.ndarray, np.ndarray | None, dict]:
+    """Return (values, missing mask, meta) for a column ``np.load`` can map back exactly."""
+
+    dtype = series.dtype
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        # Stored as UTC integers; NaT keeps its sentinel value.
+        return series.array.asi8, None, {"kind": "datetimetz", "unit": dtype.unit, "tz": str(dtype.tz)}
+    if isinstance(dtype, np.dtype) and dtype.kind in "biufcmM":
+        return series.to_numpy(), None, {"kind": "numpy"}
+    if not (dtype == object or isinstance(dtype, pd.StringDtype)):
+        raise _Uncacheable(f"column {series.name!r} has unsupported dtype {dtype}")
+
+    values = series.to_numpy(dtype=object)
+    if dtype == object:
+        missing = np.array([value is None for value in values], dtype=bool)
+    else:
+        missing = series.isna().to_numpy()
+    kinds = {type(value) for value in values[~missing]}
+    if len(kinds) > 1 or not kinds <= set(_TEXT_CODECS):
+        raise _Uncacheable(f"column {series.name!r} holds {sorted(k.__name__ for k in kinds)}")
+    kind = _TEXT_CODECS[kinds.pop()][0] if kinds else "str"
+    encoded = [
+        "" if gap else (value.isoformat() if kind == "date" else str(value))
+        for value, gap in zip(values, missing)
+    ]
+    text_values = np.array(encoded, dtype=str) if encoded else np.array([], dtype="U1")
+    return text_values, missing if missing.any() else None, {"kind": kind, "dtype": str(dtype)}
+
+
+def _decode_column(values: np.ndarray, mask: np.ndarray | None, meta: dict):
+    kind = meta["kind"]
+    if kind == "numpy":
+        return values
+    if kind == "datetimetz":
+        utc = pd.DatetimeIndex(np.asarray(values).view(f"M8[{meta['unit']}]")).tz_localize("UTC")
+        return utc.tz_convert(meta["tz"])
+    decode = _TEXT_DECODERS[kind]
+    missing = np.zeros(len(values), dtype=bool) if mask is None else np.asarray(mask)
+    restored = np.array(
+        [None if gap else decode(value) for value, gap in zip(values.tolist(), missing)], dtype=object
+    )
+    if meta["dtype"] != "object":
+        return pd.array(restored, dtype=pd.api.types.pandas_dtype(meta["dtype"]))
+    return restored
+
+
+def _load_entry(entry: Path) -> pd.DataFrame:
+    meta = json.loads((entry / _META_FILE).read_text(encoding="utf-8"))
+    # Zero-length arrays cannot be memory-mapped.
+    mmap_mode = "r" if meta["rows"] else None
+    columns = {}
+    for index, column in enumerate(meta["columns"]):
+        values = np.load(entry / f"{index}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+        mask = np.load(entry / f"{index}.mask.npy", allow_pickle=False) if column["mask"] else None
+        columns[column["name"]] = _decode_column(values, mask, column)
+    return pd.DataFrame(columns, copy=False)
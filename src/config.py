@@ -15,6 +15,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 OUTPUTS_DIR = BASE_DIR / "outputs"
 WAREHOUSE_DIR = BASE_DIR / "warehouse"
+CACHE_DIR = BASE_DIR / ".cache" / "relations"
 
 DATA_DIR.mkdir(exist_ok=True)
 OUTPUTS_DIR.mkdir(exist_ok=True)
@@ -28,6 +29,7 @@ class Settings:
     student_first: str
     student_last: str
     student_netid: str
+    index_benchmark: bool = False
 
     @classmethod
     def from_env(cls) -> "Settings":
@@ -49,6 +51,7 @@ class Settings:
             student_first=os.getenv("STUDENT_FIRST", "First"),
             student_last=os.getenv("STUDENT_LAST", "Last"),
             student_netid=os.getenv("STUDENT_NETID", "netid1234"),
+            index_benchmark=os.getenv("INDEX_BENCHMARK", "0").strip().lower() in {"1", "true", "yes"},
         )
 
     @property
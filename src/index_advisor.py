@@ -0,0 +1,306 @@
+"""Derive and apply indexes for the raw tables from the warehouse SQL."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+import logging
+import re
+import time
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from .config import WAREHOUSE_DIR
+from .db import EngineFactory
+from .seed import TABLE_FILES
+from .tests_runner import TestCase
+
+logger = logging.getLogger(__name__)
+
+ADVISOR_DIRS = ("staging", "marts", "kpis", "monitoring", "tests")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_LINE_COMMENT = re.compile(r"--[^\n]*")
+_IDENTIFIER = re.compile(r"\b(?:[a-z_][a-z0-9_]*\.)?([a-z_][a-z0-9_]*)\b")
+_CLAUSE_END = (
+    r"(?=\b(?:where|join|left|right|inner|group|order|having|union|select|from|limit)\b|;|$)"
+)
+_CLAUSES: Dict[str, re.Pattern] = {
+    "join": re.compile(r"\bon\b(.*?)" + _CLAUSE_END, re.DOTALL),
+    "filter": re.compile(r"\b(?:where|having)\b(.*?)" + _CLAUSE_END, re.DOTALL),
+    "group": re.compile(r"\bgroup\s+by\b(.*?)" + _CLAUSE_END, re.DOTALL),
+}
+_WINDOW = re.compile(r"\bpartition\s+by\b(.*?)(?:\border\s+by\b(.*?))?\)", re.DOTALL)
+_SELECT = re.compile(r"\bselect\b")
+_SELECT_TOKEN = re.compile(r"\(|\)|,|\bfrom\b")
+_ALIASED_ITEM = re.compile(r"^(.*\S)\s+as\s+([a-z_][a-z0-9_]*)$", re.DOTALL)
+_QUALIFIER = re.compile(r"^[a-z_][a-z0-9_]*\.")
+
+
+@dataclass(frozen=True)
+class ColumnUsage:
+    kind: str
+    columns: Tuple[str, ...]
+    source: Path
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    table: str
+    columns: Tuple[str, ...]
+    primary_key: bool = False
+
+    @property
+    def name(self) -> str:
+        prefix = "pk" if self.primary_key else "ix"
+        return f"{prefix}_{self.table}__{'_'.join(self.columns)}"
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "table": self.table,
+            "columns": list(self.columns),
+            "primary_key": self.primary_key,
+        }
+
+
+@dataclass
+class IndexPlan:
+    indexes: List[IndexSpec] = field(default_factory=list)
+    usages: List[ColumnUsage] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {"indexes": [spec.as_dict() for spec in self.indexes]}
+
+
+def _normalize_sql(sql: str) -> str:
+    sql = _LINE_COMMENT.sub(" ", sql)
+    sql = _STRING_LITERAL.sub("''", sql)
+    return sql.lower()
+
+
+def _identifiers(fragment: str) -> List[str]:
+    seen: List[str] = []
+    for name in _IDENTIFIER.findall(fragment):
+        if name not in seen:
+            seen.append(name)
+    return seen
+
+
+def extract_column_usage(path: Path) -> List[ColumnUsage]:
+    """Return the identifiers used in join, filter, group and window clauses of a SQL file."""
+
+    sql = _normalize_sql(path.read_text(encoding="utf-8"))
+    usages: List[ColumnUsage] = []
+    for match in _WINDOW.finditer(sql):
+        partition = tuple(_identifiers(match.group(1)))
+        order = tuple(name for name in _identifiers(match.group(2) or "") if name not in partition)
+        usages.append(ColumnUsage("partition", partition + order, path))
+    for kind, pattern in _CLAUSES.items():
+        for match in pattern.finditer(sql):
+            for name in _identifiers(match.group(1)):
+                usages.append(ColumnUsage(kind, (name,), path))
+    return usages
+
+
+def _select_items(sql: str) -> List[str]:
+    """Split every ``SELECT`` list in normalized SQL into its top-level items."""
+
+    items: List[str] = []
+    for match in _SELECT.finditer(sql):
+        depth, start = 0, match.end()
+        for token in _SELECT_TOKEN.finditer(sql, match.end()):
+            symbol = token.group()
+            if symbol == "(":
+                depth += 1
+                continue
+            if symbol == ")" and depth:
+                depth -= 1
+                continue
+            if depth:
+                continue
+            items.append(sql[start : token.start()].strip())
+            start = token.end()
+            if symbol != ",":
+                break
+    return items
+
+
+def derived_staging_columns(relative_dir: str = "staging") -> Set[str]:
+    """Return staging output columns computed from an expression rather than passed through.
+
+    ``lower(vehicle_type) AS vehicle_type`` or ``status_final AS status`` make the view
+    column differ from the raw one, so a plain index on the raw column cannot serve
+    predicates on the view.
+    """
+
+    derived: Set[str] = set()
+    for path in sorted((WAREHOUSE_DIR / relative_dir).glob("*.sql")):
+        for item in _select_items(_normalize_sql(path.read_text(encoding="utf-8"))):
+            match = _ALIASED_ITEM.match(item)
+            if match and _QUALIFIER.sub("", match.group(1).strip()) != match.group(2):
+                derived.add(match.group(2))
+    return derived
+
+
+def collect_column_usage(directories: Sequence[str] = ADVISOR_DIRS) -> List[ColumnUsage]:
+    usages: List[ColumnUsage] = []
+    for relative_dir in directories:
+        for path in sorted((WAREHOUSE_DIR / relative_dir).rglob("*.sql")):
+            usages.extend(extract_column_usage(path))
+    return usages
+
+
+def _table_columns(factory: EngineFactory, tables: Iterable[str]) -> Dict[str, List[str]]:
+    inspector = inspect(factory.get_engine())
+    return {table: [col["name"].lower() for col in inspector.get_columns(table)] for table in tables}
+
+
+def _is_unique_key(factory: EngineFactory, table: str, column: str) -> bool:
+    with factory.connect() as conn:
+        total, distinct, non_null = conn.execute(
+            text(f"SELECT COUNT(*), COUNT(DISTINCT {column}), COUNT({column}) FROM {table}")
+        ).one()
+    return total > 0 and total == distinct == non_null
+
+
+def advise_indexes(
+    factory: EngineFactory,
+    tables: Iterable[str] | None = None,
+    usages: List[ColumnUsage] | None = None,
+) -> IndexPlan:
+    """Map warehouse column usage back onto the raw tables and propose keys/indexes.
+
+    Staging SQL reads the raw tables directly, so its columns are attributed as-is.
+    Everything downstream reads the staging views, so a column is attributed to the
+    raw tables carrying it only when staging passes it through unchanged (see
+    :func:`derived_staging_columns`). Join keys that are unique and non-null in their
+    table become primary keys; everything else gets a b-tree index.
+    """
+
+    usages = usages if usages is not None else collect_column_usage()
+    columns = _table_columns(factory, tables or TABLE_FILES)
+    derived = derived_staging_columns()
+
+    plan = IndexPlan(usages=usages)
+    candidates: Dict[Tuple[str, Tuple[str, ...]], bool] = {}
+    for usage in usages:
+        usage_cols = usage.columns
+        if usage.source.parent != WAREHOUSE_DIR / "staging":
+            # Keep the leading pass-through columns only; an index prefix must match.
+            for position, col in enumerate(usage_cols):
+                if col in derived:
+                    usage_cols = usage_cols[:position]
+                    break
+        if not usage_cols:
+            continue
+        for table, table_cols in columns.items():
+            cols = tuple(col for col in usage_cols if col in table_cols)
+            if not cols or cols[0] != usage_cols[0]:
+                continue
+            joined = usage.kind == "join" and len(cols) == 1
+            candidates[(table, cols)] = candidates.get((table, cols), False) or joined
+
+    proposed: Dict[Tuple[str, Tuple[str, ...]], IndexSpec] = {}
+    keyed_tables: Set[str] = set()
+    for (table, cols), joined in candidates.items():
+        primary_key = (
+            joined and table not in keyed_tables and _is_unique_key(factory, table, cols[0])
+        )
+        if primary_key:
+            keyed_tables.add(table)
+        proposed[(table, cols)] = IndexSpec(table, cols, primary_key=primary_key)
+
+    # A composite index already serves lookups on its leading column.
+    for (table, cols), spec in proposed.items():
+        covered = any(
+            other_table == table and len(other) > len(cols) and other[: len(cols)] == cols
+            for other_table, other in proposed
+        )
+        if spec.primary_key or not covered:
+            plan.indexes.append(spec)
+    return plan
+
+
+def _create_statements(spec: IndexSpec, dialect: str) -> List[str]:
+    cols = ", ".join(f'"{col}"' for col in spec.columns)
+    if spec.primary_key and dialect != "sqlite":
+        return [
+            f'ALTER TABLE "{spec.table}" DROP CONSTRAINT IF EXISTS "{spec.name}";',
+            f'ALTER TABLE "{spec.table}" ADD CONSTRAINT "{spec.name}" PRIMARY KEY ({cols});',
+        ]
+    # SQLite cannot add a primary key to an existing table; a unique index is equivalent.
+    unique = "UNIQUE " if spec.primary_key else ""
+    return [f'CREATE {unique}INDEX IF NOT EXISTS "{spec.name}" ON "{spec.table}" ({cols});']
+
+
+def _drop_statements(spec: IndexSpec, dialect: str) -> List[str]:
+    if spec.primary_key and dialect != "sqlite":
+        return [f'ALTER TABLE "{spec.table}" DROP CONSTRAINT IF EXISTS "{spec.name}";']
+    return [f'DROP INDEX IF EXISTS "{spec.name}";']
+
+
+def analyze_tables(factory: EngineFactory, tables: Iterable[str]) -> None:
+    with factory.connect() as conn:
+        if factory.dialect == "sqlite":
+            conn.execute(text("ANALYZE;"))
+        else:
+            for table in tables:
+                conn.execute(text(f'ANALYZE "{table}";'))
+        conn.commit()
+
+
+def apply_index_plan(factory: EngineFactory, plan: IndexPlan) -> List[str]:
+    """Create every index in the plan and refresh planner statistics."""
+
+    dialect = factory.dialect
+    with factory.connect() as conn:
+        for spec in plan.indexes:
+            for statement in _create_statements(spec, dialect):
+                conn.execute(text(statement))
+            logger.debug("Created %s on %s(%s)", spec.name, spec.table, ", ".join(spec.columns))
+        conn.commit()
+    analyze_tables(factory, sorted({spec.table for spec in plan.indexes}))
+    return [spec.name for spec in plan.indexes]
+
+
+def drop_index_plan(factory: EngineFactory, plan: IndexPlan) -> None:
+    dialect = factory.dialect
+    with factory.connect() as conn:
+        for spec in plan.indexes:
+            for statement in _drop_statements(spec, dialect):
+                conn.execute(text(statement))
+        conn.commit()
+    analyze_tables(factory, sorted({spec.table for spec in plan.indexes}))
+
+
+def time_tests(factory: EngineFactory, tests: Iterable[TestCase], repeat: int = 3) -> float:
+    """Return the best-of-``repeat`` wall time in seconds to run every test query once."""
+
+    engine = factory.get_engine()
+    sql_texts = [test.sql_file.read_text(encoding="utf-8") for test in tests]
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for sql_text in sql_texts:
+            pd.read_sql(text(sql_text), engine)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def benchmark_index_plan(
+    factory: EngineFactory, plan: IndexPlan, tests: Iterable[TestCase], repeat: int = 3
+) -> Dict[str, float]:
+    """Time the test suite without and then with the plan's indexes (left applied)."""
+
+    tests = list(tests)
+    drop_index_plan(factory, plan)
+    before = time_tests(factory, tests, repeat)
+    apply_index_plan(factory, plan)
+    after = time_tests(factory, tests, repeat)
+    return {
+        "before_seconds": round(before, 6),
+        "after_seconds": round(after, 6),
+        "speedup": round(before / after, 3) if after else 0.0,
+    }
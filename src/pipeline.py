@@ -5,10 +5,17 @@ import logging
 from pathlib import Path
 from typing import Dict
 
+from .cache import RelationCache
 from .config import DATA_DIR, Settings, mask_url
 from .data_bootstrap import ensure_sample_csvs, preview_csvs
 from .db import EngineFactory, set_search_path_safely, smoke_test
-from .reporting import export_views, generate_stakeholder_reply
+from .index_advisor import advise_indexes, apply_index_plan, benchmark_index_plan
+from .reporting import (
+    SEGMENT_REPLY_DIR,
+    export_views,
+    generate_segment_replies,
+    generate_stakeholder_reply,
+)
 from .seed import load_tables, verify_row_counts
 from .sql_runner import list_sql_files, run_sql_files
 from .tests_runner import RUN_LOG_PATH, load_tests, run_tests
@@ -50,6 +57,10 @@ def run_pipeline(settings: Settings | None = None) -> Dict[str, object]:
     verified_counts = verify_row_counts(factory)
     logger.info("Row count verification: %s", verified_counts)
 
+    index_plan = advise_indexes(factory)
+    created_indexes = apply_index_plan(factory, index_plan)
+    logger.info("Created indexes/keys from warehouse SQL: %s", created_indexes)
+
     staging_files = list_sql_files("staging", dialect)
     run_sql_files(factory, staging_files)
     logger.info("Created staging views: %s", [f.stem for f in staging_files])
@@ -79,8 +90,20 @@ def run_pipeline(settings: Settings | None = None) -> Dict[str, object]:
     custom_results = run_tests(factory, custom_tests, "custom tests")
     _print_test_results("Custom", custom_results)
 
-    reply_path = generate_stakeholder_reply(factory, settings)
-    export_counts = export_views(factory)
+    index_timings = None
+    if settings.index_benchmark:
+        index_timings = benchmark_index_plan(factory, index_plan, staging_tests + mart_tests + custom_tests)
+        logger.info(
+            "Test suite timing without indexes %.4fs, with indexes %.4fs (%.2fx)",
+            index_timings["before_seconds"],
+            index_timings["after_seconds"],
+            index_timings["speedup"],
+        )
+
+    cache = RelationCache(factory)
+    reply_path = generate_stakeholder_reply(factory, settings, cache=cache)
+    segment_replies = generate_segment_replies(factory, settings, cache=cache)
+    export_counts = export_views(factory, cache=cache)
 
     summary = {
         "row_counts": row_counts,
@@ -88,12 +111,15 @@ def run_pipeline(settings: Settings | None = None) -> Dict[str, object]:
         "staging_tests": [r.as_dict() for r in staging_results],
         "mart_tests": [r.as_dict() for r in mart_results],
         "custom_tests": [r.as_dict() for r in custom_results],
+        "indexes": {**index_plan.as_dict(), "test_timings": index_timings},
         "stakeholder_reply": reply_path,
+        "segment_replies": len(segment_replies),
         "exports": export_counts,
         "run_log": RUN_LOG_PATH,
     }
 
     logger.info("Stakeholder reply written to %s", reply_path)
+    logger.info("Segment replies written: %s (in %s)", len(segment_replies), SEGMENT_REPLY_DIR)
     for view, count in export_counts.items():
         logger.info("Exported %s (%s rows)", view, count)
     logger.info("Run log available at %s", RUN_LOG_PATH)
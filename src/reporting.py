@@ -1,33 +1,46 @@
 """Stakeholder deliverables: summary markdown and CSV exports."""
 from __future__ import annotations
 
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Sequence
 import datetime
+import re
+import tempfile
+import time
 
+import numpy as np
 import pandas as pd
 from sqlalchemy import text
 
+from .cache import RelationCache
 from .config import OUTPUTS_DIR, Settings
 from .db import EngineFactory
 
 
-def generate_stakeholder_reply(factory: EngineFactory, settings: Settings) -> Path:
-    engine = factory.get_engine()
-    df = pd.read_sql(text("SELECT * FROM kpi_delivery_overview"), engine)
-    on_time = adm = crr = 0.0
-    if not df.empty:
-        on_time = float(df.loc[0, "on_time_rate"] or 0) * 100.0
-        adm = float(df.loc[0, "avg_delivery_minutes"] or 0)
-        crr = float(df.loc[0, "cancel_return_rate"] or 0) * 100.0
+def read_relation(
+    factory: EngineFactory,
+    relation: str,
+    cache: RelationCache | None = None,
+    zero_copy: bool = False,
+) -> pd.DataFrame:
+    """Read a whole view/table, going through the local cache when it covers the relation.
 
-    output_path = OUTPUTS_DIR / (
-        f"Lab06_{settings.student_first}_{settings.student_last}_{settings.student_netid}_Reply.md"
-    )
+    Cached frames are copied so they can be edited like a ``pd.read_sql`` result. Pass
+    ``zero_copy=True`` to get the memory-mapped frame instead; its numeric columns are
+    read-only, so without pandas copy-on-write writing into them raises ``ValueError``.
+    """
 
-    body = f"""# Stakeholder Reply — DashDash Data Quality & KPIs
+    if cache is not None and relation in cache:
+        df = cache.read_frame(relation)
+        return df if zero_copy else df.copy()
+    return pd.read_sql(text(f"SELECT * FROM {relation}"), factory.get_engine())
 
-**KPI summary:** On-Time Delivery: {on_time:.2f}% · Average Delivery Minutes: {adm:.2f} · Cancel/Return Rate: {crr:.2f}%
+
+REPLY_TEMPLATE = """# Stakeholder Reply — DashDash Data Quality & KPIs
+
+{scope}**KPI summary:** On-Time Delivery: {on_time} · Average Delivery Minutes: {adm} · Cancel/Return Rate: {crr}
 
 **What changed after remediation**
 - Deduplicated orders by `order_id` (kept earliest record); removed duplicates from KPI universe.
@@ -38,13 +51,140 @@ def generate_stakeholder_reply(factory: EngineFactory, settings: Settings) -> Pa
 **Recommendation**
 - Proceed with the “10‑Minute Free Delivery Insurance” promo **if** daily on‑time % remains ≥ 85% during soft‑launch; otherwise, pause the offer in regions where scooter/car availability is thin.
 
-_Generated with GPT-5 Pro on {datetime.datetime.utcnow():%Y-%m-%d %H:%M UTC}. Student verified the numbers and process._
+_Generated with GPT-5 Pro on {generated}. Student verified the numbers and process._
 """
 
+SEGMENT_TYPES = ("region", "restaurant", "day")
+SEGMENT_REPLY_DIR = OUTPUTS_DIR / "segment_replies"
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _generated_stamp() -> str:
+    return f"{datetime.datetime.utcnow():%Y-%m-%d %H:%M UTC}"
+
+
+def _format_metric(value: object, scale: float = 1.0, suffix: str = "") -> str:
+    """Format a KPI value for the reply; NULL (no qualifying orders) renders as ``n/a``."""
+
+    if value is None or pd.isna(value):
+        return "n/a"
+    return f"{float(value) * scale:.2f}{suffix}"
+
+
+def generate_stakeholder_reply(
+    factory: EngineFactory, settings: Settings, cache: RelationCache | None = None
+) -> Path:
+    df = read_relation(factory, "kpi_delivery_overview", cache, zero_copy=True)
+    on_time = adm = crr = 0.0
+    if not df.empty:
+        on_time = float(df.loc[0, "on_time_rate"] or 0) * 100.0
+        adm = float(df.loc[0, "avg_delivery_minutes"] or 0)
+        crr = float(df.loc[0, "cancel_return_rate"] or 0) * 100.0
+
+    output_path = OUTPUTS_DIR / (
+        f"Lab06_{settings.student_first}_{settings.student_last}_{settings.student_netid}_Reply.md"
+    )
+
+    body = REPLY_TEMPLATE.format(
+        scope="",
+        on_time=f"{on_time:.2f}%",
+        adm=f"{adm:.2f}",
+        crr=f"{crr:.2f}%",
+        generated=_generated_stamp(),
+    )
+
     output_path.write_text(body, encoding="utf-8")
     return output_path
 
 
+def write_segment_replies(
+    kpis: pd.DataFrame,
+    settings: Settings,
+    output_dir: Path | None = None,
+    max_workers: int = 8,
+) -> List[Path]:
+    """Render one reply per row of a segment KPI frame and write the files in parallel.
+
+    ``kpis`` has the columns of ``kpi_delivery_segments``. Metrics that are NULL for a
+    segment (e.g. no delivered orders) render as ``n/a``. Replies left in ``output_dir``
+    by earlier runs are removed first, so only current segments remain.
+    """
+
+    target_dir = output_dir or SEGMENT_REPLY_DIR
+    prefix = f"Lab06_{settings.student_first}_{settings.student_last}_{settings.student_netid}_"
+
+    render = REPLY_TEMPLATE.format
+    generated = _generated_stamp()
+    paths: List[Path] = []
+    bodies: List[str] = []
+    for row in kpis.itertuples(index=False):
+        safe_key = _UNSAFE_FILENAME_CHARS.sub("-", str(row.segment_key))
+        paths.append(target_dir / f"{prefix}{row.segment_type}_{safe_key}_Reply.md")
+        bodies.append(
+            render(
+                scope=f"**Segment:** {row.segment_type} = `{row.segment_key}` · Orders: {row.orders}\n\n",
+                on_time=_format_metric(row.on_time_rate, 100.0, "%"),
+                adm=_format_metric(row.avg_delivery_minutes),
+                crr=_format_metric(row.cancel_return_rate, 100.0, "%"),
+                generated=generated,
+            )
+        )
+
+    collisions = sorted(path.name for path, count in Counter(paths).items() if count > 1)
+    if collisions:
+        raise ValueError(f"Segment keys map to the same reply file: {collisions}")
+
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for stale in target_dir.glob(f"{prefix}*_Reply.md"):
+        stale.unlink()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(lambda item: item[0].write_text(item[1], encoding="utf-8"), zip(paths, bodies)))
+    return paths
+
+
+def generate_segment_replies(
+    factory: EngineFactory,
+    settings: Settings,
+    segment_types: Sequence[str] = SEGMENT_TYPES,
+    output_dir: Path | None = None,
+    cache: RelationCache | None = None,
+    max_workers: int = 8,
+) -> List[Path]:
+    """Write a stakeholder reply per region/restaurant/day from a single grouped KPI query."""
+
+    kpis = read_relation(factory, "kpi_delivery_segments", cache, zero_copy=True)
+    kpis = kpis[kpis["segment_type"].isin(segment_types)]
+    return write_segment_replies(kpis, settings, output_dir, max_workers)
+
+
+def benchmark_segment_replies(
+    settings: Settings, segments: int = 5000, max_workers: int = 8
+) -> Dict[str, float]:
+    """Measure render + write throughput for ``segments`` synthetic segment KPI rows."""
+
+    rng = np.random.default_rng(0)
+    kpis = pd.DataFrame(
+        {
+            "segment_type": np.array(SEGMENT_TYPES)[np.arange(segments) % len(SEGMENT_TYPES)],
+            "segment_key": np.arange(segments).astype(str),
+            "orders": rng.integers(1, 500, segments),
+            "on_time_rate": rng.random(segments),
+            "avg_delivery_minutes": rng.uniform(10, 90, segments),
+            "cancel_return_rate": rng.random(segments) / 5,
+        }
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        write_segment_replies(kpis, settings, Path(tmp), max_workers)
+        elapsed = time.perf_counter() - started
+    return {
+        "segments": segments,
+        "seconds": round(elapsed, 4),
+        "segments_per_second": round(segments / elapsed, 1) if elapsed else 0.0,
+    }
+
+
 EXPORT_VIEWS: Dict[str, Path] = {
     "stg_orders": OUTPUTS_DIR / "stg_orders_export.csv",
     "fct_deliveries": OUTPUTS_DIR / "fct_deliveries_export.csv",
@@ -53,12 +193,15 @@ EXPORT_VIEWS: Dict[str, Path] = {
 }
 
 
-def export_views(factory: EngineFactory, views: Dict[str, Path] | None = None) -> Dict[str, int]:
-    engine = factory.get_engine()
+def export_views(
+    factory: EngineFactory,
+    views: Dict[str, Path] | None = None,
+    cache: RelationCache | None = None,
+) -> Dict[str, int]:
     targets = views or EXPORT_VIEWS
     exported: Dict[str, int] = {}
     for view, path in targets.items():
-        df = pd.read_sql(text(f"SELECT * FROM {view}"), engine)
+        df = read_relation(factory, view, cache, zero_copy=True)
         df.to_csv(path, index=False)
         exported[view] = len(df)
     return exported
@@ -20,7 +20,7 @@ TABLE_FILES = {
 
 DROP_VIEWS_POSTGRES = [
     "DROP VIEW IF EXISTS stg_orders, stg_restaurants, stg_couriers, stg_customers CASCADE;",
-    "DROP VIEW IF EXISTS fct_deliveries, dim_restaurant, dim_courier, dim_customer, kpi_delivery_overview, monitoring_dq_exceptions CASCADE;",
+    "DROP VIEW IF EXISTS fct_deliveries, dim_restaurant, dim_courier, dim_customer, kpi_delivery_overview, kpi_delivery_segments, monitoring_dq_exceptions CASCADE;",
 ]
 
 DROP_VIEWS_SQLITE = [
@@ -33,6 +33,7 @@ DROP_VIEWS_SQLITE = [
     "DROP VIEW IF EXISTS dim_courier;",
     "DROP VIEW IF EXISTS dim_customer;",
     "DROP VIEW IF EXISTS kpi_delivery_overview;",
+    "DROP VIEW IF EXISTS kpi_delivery_segments;",
     "DROP VIEW IF EXISTS monitoring_dq_exceptions;",
 ]
 
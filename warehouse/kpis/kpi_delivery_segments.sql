@@ -0,0 +1,25 @@
+CREATE OR REPLACE VIEW kpi_delivery_segments AS
+WITH o AS (
+  SELECT
+    s.*,
+    COALESCE(c.region, 'unknown')                         AS region,
+    s.order_ts::date::text                                AS order_day,
+    s.order_id IN (SELECT order_id FROM fct_deliveries)   AS in_fct
+  FROM stg_orders s
+  LEFT JOIN stg_couriers c ON s.courier_id = c.courier_id
+),
+seg AS (
+  SELECT 'region' AS segment_type, region AS segment_key, o.* FROM o
+  UNION ALL SELECT 'restaurant', COALESCE(restaurant_id::text, 'unknown'), o.* FROM o
+  UNION ALL SELECT 'day', COALESCE(order_day, 'unknown'), o.* FROM o
+)
+SELECT
+  segment_type,
+  segment_key,
+  COUNT(*)                                                                     AS orders,
+  AVG(CASE WHEN in_fct THEN (CASE WHEN on_time_flag THEN 1 ELSE 0 END) END)::numeric(5,4) AS on_time_rate,
+  AVG(CASE WHEN in_fct THEN delivery_minutes END)::numeric(6,2)               AS avg_delivery_minutes,
+  (COUNT(*) FILTER (WHERE status IN ('canceled','returned'))::numeric
+   / NULLIF(COUNT(*),0))::numeric(5,4)                                         AS cancel_return_rate
+FROM seg
+GROUP BY segment_type, segment_key;
@@ -0,0 +1,25 @@
+CREATE VIEW kpi_delivery_segments AS
+WITH o AS (
+  SELECT
+    s.*,
+    COALESCE(c.region, 'unknown') AS region,
+    date(s.order_ts) AS order_day,
+    CASE WHEN s.order_id IN (SELECT order_id FROM fct_deliveries) THEN 1 ELSE 0 END AS in_fct
+  FROM stg_orders s
+  LEFT JOIN stg_couriers c ON s.courier_id = c.courier_id
+),
+seg AS (
+  SELECT 'region' AS segment_type, region AS segment_key, o.* FROM o
+  UNION ALL SELECT 'restaurant', COALESCE(CAST(restaurant_id AS TEXT), 'unknown'), o.* FROM o
+  UNION ALL SELECT 'day', COALESCE(order_day, 'unknown'), o.* FROM o
+)
+SELECT
+  segment_type,
+  segment_key,
+  COUNT(*) AS orders,
+  AVG(CASE WHEN in_fct = 1 THEN (CASE WHEN on_time_flag = 1 THEN 1.0 ELSE 0.0 END) END) AS on_time_rate,
+  AVG(CASE WHEN in_fct = 1 THEN delivery_minutes END) AS avg_delivery_minutes,
+  CAST(SUM(CASE WHEN status IN ('canceled','returned') THEN 1 ELSE 0 END) AS REAL)
+    / NULLIF(COUNT(*), 0) AS cancel_return_rate
+FROM seg
+GROUP BY segment_type, segment_key;